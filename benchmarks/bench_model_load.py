@@ -0,0 +1,132 @@
+# benchmarks/bench_model_load.py
+"""
+Benchmarks CNN model load time and memory for the .pth and mapped (.dpw)
+weight formats.
+
+Each measurement runs in a fresh process. With --processes N, N loaders are
+kept alive at the same time and their proportional set size (PSS) is summed,
+which shows how much physical memory the weights really cost when several
+workers share them through the page cache.
+
+    python benchmarks/bench_model_load.py --processes 4
+    sudo python benchmarks/bench_model_load.py --drop-caches   # true cold start (Linux, root)
+
+Run `python download_model.py` first so both formats exist.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MEMORY_FIELDS = ("Rss", "Pss", "Shared_Clean", "Private_Clean", "Private_Dirty")
+
+
+def _memory_kb():
+    """Reads the process memory breakdown from /proc (Linux only)."""
+    stats = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in MEMORY_FIELDS:
+                    stats[key] = int(value.split()[0])
+    except OSError:
+        import resource
+        stats["Rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return stats
+
+
+def _child(weight_format, model_path):
+    import torch
+    from src.detection.strategies.cnn_model import _build_model, load_model
+    from src.detection.weight_format import mapped_weights_path
+
+    baseline = _memory_kb()
+    start = time.perf_counter()
+    if weight_format == "pth":
+        model = _build_model()
+        model.load_state_dict(torch.load(model_path, map_location="cpu"))
+        model.eval()
+    else:
+        model = load_model(mapped_weights_path(model_path), torch.device("cpu"))
+    load_seconds = time.perf_counter() - start
+
+    # Touch every weight once, as the first inference would.
+    with torch.no_grad():
+        model(torch.zeros(1, 3, 224, 224))
+    first_inference_seconds = time.perf_counter() - start - load_seconds
+
+    # Wait until every sibling process has loaded before measuring sharing.
+    print("loaded", flush=True)
+    sys.stdin.readline()
+    memory = _memory_kb()
+    print(json.dumps({
+        "load_seconds": load_seconds,
+        "first_inference_seconds": first_inference_seconds,
+        "memory_kb": memory,
+        "baseline_kb": baseline,
+    }), flush=True)
+
+
+def _drop_caches():
+    subprocess.run(["sync"], check=True)
+    with open("/proc/sys/vm/drop_caches", "w") as f:
+        f.write("3\n")
+
+
+def _run(weight_format, model_path, processes):
+    children = [
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--child", weight_format, "--model-path", model_path],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, cwd=ROOT)
+        for _ in range(processes)
+    ]
+    for child in children:
+        while child.stdout.readline().strip() != "loaded":
+            if child.poll() is not None:
+                raise RuntimeError(f"{weight_format} loader exited with code {child.returncode}")
+    results = []
+    for child in children:
+        child.stdin.write("\n")
+        child.stdin.flush()
+    for child in children:
+        for line in child.stdout:
+            if line.startswith("{"):
+                results.append(json.loads(line))
+        child.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model-path", default=os.path.join(ROOT, "models", "best_model_efficientnet_b7.pth"))
+    parser.add_argument("--processes", type=int, default=1, help="Loaders kept alive at the same time.")
+    parser.add_argument("--drop-caches", action="store_true", help="Drop the page cache before each run.")
+    parser.add_argument("--child", choices=("pth", "dpw"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child, args.model_path)
+        return
+
+    print(f"{'format':<6} {'load s':>8} {'1st inf s':>10} {'RSS MB':>8} {'private MB':>11} {'total PSS MB':>13}")
+    for weight_format in ("pth", "dpw"):
+        if args.drop_caches:
+            _drop_caches()
+        results = _run(weight_format, args.model_path, args.processes)
+        load = max(r["load_seconds"] for r in results)
+        first = max(r["first_inference_seconds"] for r in results)
+        rss = max(r["memory_kb"].get("Rss", 0) for r in results) / 1024
+        private = max(r["memory_kb"].get("Private_Clean", 0) + r["memory_kb"].get("Private_Dirty", 0)
+                      for r in results) / 1024
+        total_pss = sum(r["memory_kb"].get("Pss", 0) for r in results) / 1024
+        print(f"{weight_format:<6} {load:>8.2f} {first:>10.2f} {rss:>8.0f} {private:>11.0f} {total_pss:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
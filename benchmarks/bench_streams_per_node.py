@@ -0,0 +1,139 @@
+# benchmarks/bench_streams_per_node.py
+"""
+Measures how many concurrent hybrid detection streams one machine sustains,
+with library-default thread pools versus the `resources` limits in
+config.yaml.
+
+Each stream is a HybridProcessor driven by its own thread, as with several
+browser sessions in one Streamlit process. A stream count is sustained when
+every stream keeps at least --target-fps. Each run uses a fresh process
+because thread-pool sizes are process-wide.
+
+    python benchmarks/bench_streams_per_node.py --max-streams 8 --target-fps 15
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _load_frames(video_path, limit=300):
+    import cv2
+    if video_path:
+        capture = cv2.VideoCapture(video_path)
+        frames = []
+        while len(frames) < limit:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            frames.append(frame)
+        capture.release()
+        if frames:
+            return frames
+    image = cv2.imread(os.path.join(ROOT, "assets", "sleep.jpeg"))
+    return [cv2.resize(image, (640, 480))]
+
+
+def _child(mode, streams, seconds, video_path, config_path):
+    with open(config_path) as f:
+        config = yaml.safe_load(f)
+    if mode == "default":
+        config.pop('resources', None)
+    config['detection_strategy'] = 'hybrid'
+
+    from src.runtime.resource_manager import get_resource_manager
+    get_resource_manager(config)
+    from src.detection.strategies.hybrid import HybridProcessor
+
+    frames = _load_frames(video_path)
+    processors = [HybridProcessor(config) for _ in range(streams)]
+    for processor in processors:
+        wait = getattr(processor.cnn_processor, 'wait_until_ready', None)
+        if wait:
+            wait(timeout=120)
+
+    results = [None] * streams
+    start_barrier = threading.Barrier(streams)
+
+    def run(index):
+        processor = processors[index]
+        latencies = []
+        start_barrier.wait()
+        deadline = time.perf_counter() + seconds
+        i = 0
+        while time.perf_counter() < deadline:
+            frame = frames[i % len(frames)].copy()
+            t0 = time.perf_counter()
+            processor.process_frame(frame)
+            latencies.append(time.perf_counter() - t0)
+            i += 1
+        latencies.sort()
+        results[index] = {
+            "fps": len(latencies) / seconds,
+            "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0,
+        }
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(streams)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for processor in processors:
+        processor.close()
+    print(json.dumps(results))
+
+
+def _measure(mode, streams, args):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, "--streams", str(streams),
+         "--seconds", str(args.seconds), "--config", args.config] + (["--video", args.video] if args.video else []),
+        capture_output=True, text=True, cwd=ROOT, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--config", default=os.path.join(ROOT, "config.yaml"))
+    parser.add_argument("--video", help="Video to loop; defaults to assets/sleep.jpeg.")
+    parser.add_argument("--max-streams", type=int, default=8)
+    parser.add_argument("--target-fps", type=float, default=15.0)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--child", choices=("default", "managed"), help=argparse.SUPPRESS)
+    parser.add_argument("--streams", type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child, args.streams, args.seconds, args.video, args.config)
+        return
+
+    print(f"cores: {os.cpu_count()}  target: {args.target_fps:g} fps per stream")
+    summary = {}
+    for mode in ("default", "managed"):
+        sustained = 0
+        print(f"\n[{mode}]")
+        print(f"{'streams':>7} {'min fps':>8} {'mean fps':>9} {'worst p95 ms':>13}")
+        for streams in range(1, args.max_streams + 1):
+            results = _measure(mode, streams, args)
+            min_fps = min(r["fps"] for r in results)
+            mean_fps = sum(r["fps"] for r in results) / len(results)
+            worst_p95 = max(r["p95_ms"] for r in results)
+            print(f"{streams:>7} {min_fps:>8.1f} {mean_fps:>9.1f} {worst_p95:>13.1f}")
+            if min_fps < args.target_fps:
+                break
+            sustained = streams
+        summary[mode] = sustained
+
+    print(f"\nStreams per node at {args.target_fps:g} fps: "
+          f"default={summary['default']}  managed={summary['managed']}")
+
+
+if __name__ == "__main__":
+    main()
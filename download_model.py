@@ -1,7 +1,10 @@
 # download_model.py
 import os
+import time
 from huggingface_hub import hf_hub_download
 
+from src.detection.weight_format import convert_checkpoint, verify_mapped_weights
+
 # --- Configuration ---
 # Details from your Hugging Face repository screenshot.
 REPO_ID = "Testys/drowsiness-detection-model"
@@ -33,10 +36,32 @@ def download_model():
         )
         print(f"\nModel downloaded successfully!")
         print(f"Saved to: {model_path}")
+        return model_path
 
     except Exception as e:
         print(f"\nAn error occurred during download: {e}")
         print("Please check the repository ID, filename, and your network connection.")
+        return None
+
+def convert_model(model_path):
+    """
+    Converts the downloaded .pth checkpoint into the memory-mappable,
+    pickle-free weight format that the CNN processor loads zero-copy.
+    """
+    print(f"\nConverting '{model_path}' to the mapped weight format...")
+    try:
+        start_time = time.perf_counter()
+        out_path, checksum = convert_checkpoint(model_path)
+        if not verify_mapped_weights(out_path):
+            raise ValueError("checksum verification failed after writing")
+        print(f"Converted in {time.perf_counter() - start_time:.1f}s.")
+        print(f"Saved to: {out_path}")
+        print(f"SHA-256 (tensor data): {checksum}")
+    except Exception as e:
+        print(f"\nAn error occurred during conversion: {e}")
+        print("The app will fall back to loading the .pth checkpoint.")
 
 if __name__ == "__main__":
-    download_model()
+    model_path = download_model()
+    if model_path:
+        convert_model(model_path)
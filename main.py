@@ -1,9 +1,10 @@
 # drive_paddy/main.py
 import streamlit as st
-import yaml
 import os
 from dotenv import load_dotenv
 
+from src.config.config_service import get_config_service
+
 # --- Main Application UI ---
 st.set_page_config(
     page_title="Drive Paddy | Home",
@@ -11,16 +12,16 @@ st.set_page_config(
     layout="wide"
 )
 
-# Load config to display current settings on the home page
+# Load config to display current settings on the home page.
+# The config service is shared and watches config.yaml, so edits show up on the next rerun.
 @st.cache_resource
 def load_app_config():
     load_dotenv()
     gemini_api_key = os.getenv("GEMINI_API_KEY")
-    with open('config.yaml', 'r') as f:
-        config = yaml.safe_load(f)
-    return config, gemini_api_key
+    return get_config_service('config.yaml'), gemini_api_key
 
-config, gemini_api_key = load_app_config()
+config_service, gemini_api_key = load_app_config()
+config = config_service.config
 
 # --- Initialize Session State ---
 # This ensures they are set when the app first loads.
@@ -1,7 +1,6 @@
 # drive_paddy/pages/1_Live_Detection.py
 import streamlit as st
 from streamlit_webrtc import webrtc_streamer, RTCConfiguration, VideoProcessorBase
-import yaml
 import av
 import os
 from dotenv import load_dotenv
@@ -11,20 +10,24 @@ import time
 
 from src.detection.factory import get_detector
 from src.alerting.alert_system import get_alerter
+from src.config.config_service import get_config_service
+from src.runtime.resource_manager import get_resource_manager
+from src.webrtc.ice_servers import get_ice_server_provider
 
 # --- Load Configuration and Environment Variables ---
 @st.cache_resource
 def load_app_config():
-    """Loads config from yaml and .env files."""
+    """Starts the shared config.yaml watcher and loads the .env file."""
     load_dotenv()
     gemini_api_key = os.getenv("GEMINI_API_KEY")
     # Navigate up to the root to find the config file
     config_path = "/config.yaml" if os.path.exists("/config.yaml") else "config.yaml"
-    with open(config_path, 'r') as f:
-        config = yaml.safe_load(f)
-    return config, gemini_api_key
+    config_service = get_config_service(config_path)
+    # Thread limits are process-wide, so they are applied once before any detector starts.
+    get_resource_manager(config_service.config)
+    return config_service, gemini_api_key
 
-config, gemini_api_key = load_app_config()
+config_service, gemini_api_key = load_app_config()
 
 # --- Initialize Session State (if not already done in main.py) ---
 if "play_audio" not in st.session_state:
@@ -46,19 +49,47 @@ def autoplay_audio(audio_bytes: bytes):
 # --- WebRTC Video Processor ---
 class VideoProcessor(VideoProcessorBase):
     def __init__(self):
-        self._detector = get_detector(config)
-        self._alerter = get_alerter(config, gemini_api_key)
+        self._created_at = time.perf_counter()
+        self._first_frame_logged = False
+        self._config_version, self._config = config_service.snapshot()
+        self._detector = get_detector(self._config)
+        self._alerter = get_alerter(self._config, gemini_api_key)
+
+    def _apply_config_updates(self):
+        """Applies a newer config.yaml between frames, rebuilding only what changed."""
+        version, new_config = config_service.snapshot()
+        if version == self._config_version:
+            return
+
+        rebuild_detector = (
+            new_config['detection_strategy'] != self._config['detection_strategy']
+            or new_config['cnn_model_settings'].get('execution_mode')
+            != self._config['cnn_model_settings'].get('execution_mode'))
+        if rebuild_detector:
+            self._detector.close()
+            self._detector = get_detector(new_config)
+        else:
+            self._detector.update_config(new_config)
+
+        if new_config.get('gemini_api') != self._config.get('gemini_api'):
+            self._alerter = get_alerter(new_config, gemini_api_key)
+        else:
+            self._alerter.update_config(new_config)
+
+        self._config_version, self._config = version, new_config
 
     def recv(self, frame: av.VideoFrame) -> av.VideoFrame:
+        self._apply_config_updates()
         img = frame.to_ndarray(format="bgr24")
         
-        strategy = config.get('detection_strategy')
+        strategy = self._config.get('detection_strategy')
         if strategy == 'hybrid':
             processed_frame, alert_triggered, active_alerts = self._detector.process_frame(img)
             st.session_state.active_alerts = active_alerts if alert_triggered else {"status": "Awake"}
         else: # Fallback for simpler strategies
             processed_frame, indicators = self._detector.process_frame(img)
-            alert_triggered = any(indicators.values())
+            # Only the boolean indicators count; details and probabilities are informational.
+            alert_triggered = any(value for value in indicators.values() if isinstance(value, bool))
             st.session_state.active_alerts = indicators if alert_triggered else {"status": "Awake"}
 
         if alert_triggered:
@@ -68,8 +99,15 @@ class VideoProcessor(VideoProcessorBase):
         else:
             self._alerter.reset_alert()
             
+        if not self._first_frame_logged:
+            self._first_frame_logged = True
+            print(f"Time to first processed frame: {(time.perf_counter() - self._created_at) * 1000:.0f} ms")
+
         return av.VideoFrame.from_ndarray(processed_frame, format="bgr24")
 
+    def on_ended(self):
+        self._detector.close()
+
 # --- Page UI ---
 # The st.set_page_config() call has been removed from this file.
 # The configuration from main.py will apply to this page.
@@ -77,15 +115,10 @@ st.title("📹 Live Drowsiness Detection")
 st.info("Press 'START' to activate your camera and begin monitoring.")
 
 # --- Robust RTC Configuration ---
-# Provide a list of STUN servers for better reliability.
-RTC_CONFIGURATION = RTCConfiguration({
-    "iceServers": [
-        {"urls": ["stun:stun.l.google.com:19302"]},
-        {"urls": ["stun:stun1.l.google.com:19302"]},
-        {"urls": ["stun:stun2.l.google.com:19302"]},
-        {"urls": ["stun:stun.services.mozilla.com:3478"]},
-    ]
-})
+# TURN credentials are fetched and refreshed in the background by a provider
+# shared across sessions; this only reads its cache (static STUN list until ready).
+ice_server_provider = get_ice_server_provider(config_service.config)
+RTC_CONFIGURATION = RTCConfiguration({"iceServers": ice_server_provider.get_ice_servers()})
 
 
 col1, col2 = st.columns([3, 1])
@@ -17,6 +17,11 @@ class BaseAlerter:
         self.last_alert_time = 0
         self.alert_on = False
 
+    def update_config(self, config):
+        """Applies new alerting settings without resetting the cooldown timer."""
+        self.config = config['alerting']
+        self.cooldown = self.config['alert_cooldown_seconds']
+
     def trigger_alert(self):
         raise NotImplementedError
 
@@ -30,15 +35,23 @@ class FileAlertSystem(BaseAlerter):
     def __init__(self, config):
         super().__init__(config)
         self.sound_path = self.config['alert_sound_path']
-        self.audio_bytes = None
+        self.audio_bytes = self._load_audio()
+
+    def _load_audio(self):
         try:
             if os.path.exists(self.sound_path):
                 with open(self.sound_path, "rb") as f:
-                    self.audio_bytes = f.read()
-            else:
-                print(f"Warning: Alert sound file not found at '{self.sound_path}'.")
+                    return f.read()
+            print(f"Warning: Alert sound file not found at '{self.sound_path}'.")
         except Exception as e:
             print(f"Warning: Could not load audio file. Error: {e}.")
+        return None
+
+    def update_config(self, config):
+        super().update_config(config)
+        if self.config['alert_sound_path'] != self.sound_path:
+            self.sound_path = self.config['alert_sound_path']
+            self.audio_bytes = self._load_audio()
 
     def trigger_alert(self):
         current_time = time.time()
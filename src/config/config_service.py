@@ -0,0 +1,266 @@
+# drive_paddy/config/config_service.py
+import os
+import threading
+
+import yaml
+
+STRATEGIES = ("geometric", "cnn_model", "hybrid")
+CNN_EXECUTION_MODES = ("thread", "process")
+ICE_BACKENDS = ("twilio", "local", "static")
+WEIGHT_KEYS = ("eye_closure", "yawning", "head_nod", "looking_away", "cnn_prediction")
+RESOURCE_THREAD_KEYS = ("torch_intra_op_threads", "torch_inter_op_threads", "opencv_threads", "hybrid_executor_workers")
+AFFINITY_STAGES = ("geometric", "cnn")
+
+# (section, key, type, minimum, maximum) for every setting the detectors read.
+_SCHEMA = [
+    ("geometric_settings", "eye_ar_thresh", float, 0.0, None),
+    ("geometric_settings", "eye_ar_consec_frames", int, 1, None),
+    ("geometric_settings", "yawn_mar_thresh", float, 0.0, None),
+    ("geometric_settings", "yawn_consec_frames", int, 1, None),
+    ("geometric_settings", "head_nod_thresh", float, 0.0, 90.0),
+    ("geometric_settings", "head_look_away_thresh", float, 0.0, 90.0),
+    ("geometric_settings", "head_pose_consec_frames", int, 1, None),
+    ("cnn_model_settings", "model_path", str, None, None),
+    ("cnn_model_settings", "confidence_thresh", float, 0.0, 1.0),
+    ("cnn_model_settings", "warmup_iterations", int, 0, None),
+    ("cnn_model_settings", "verify_checksum", bool, None, None),
+    ("hybrid_settings", "alert_threshold", float, 0.0, None),
+    ("alerting", "alert_sound_path", str, None, None),
+    ("alerting", "alert_cooldown_seconds", float, 0.0, None),
+]
+
+
+class ConfigValidationError(ValueError):
+    """Raised when a configuration file fails validation."""
+
+
+def _check_value(name, value, expected_type, minimum, maximum):
+    if expected_type is bool:
+        valid_type = isinstance(value, bool)
+    elif expected_type is float:
+        valid_type = isinstance(value, (int, float)) and not isinstance(value, bool)
+    else:
+        valid_type = isinstance(value, expected_type) and not isinstance(value, bool)
+    if not valid_type:
+        raise ConfigValidationError(f"'{name}' must be of type {expected_type.__name__}, got {value!r}.")
+    if minimum is not None and value < minimum:
+        raise ConfigValidationError(f"'{name}' must be >= {minimum}, got {value}.")
+    if maximum is not None and value > maximum:
+        raise ConfigValidationError(f"'{name}' must be <= {maximum}, got {value}.")
+
+
+def validate_config(config):
+    """
+    Validates a parsed configuration.
+
+    Raises:
+        ConfigValidationError: If a section or setting is missing or invalid.
+    """
+    if not isinstance(config, dict):
+        raise ConfigValidationError("Configuration must be a mapping.")
+    if config.get('detection_strategy') not in STRATEGIES:
+        raise ConfigValidationError(
+            f"'detection_strategy' must be one of {STRATEGIES}, got {config.get('detection_strategy')!r}.")
+
+    for section, key, expected_type, minimum, maximum in _SCHEMA:
+        settings = config.get(section)
+        if not isinstance(settings, dict) or key not in settings:
+            raise ConfigValidationError(f"Missing setting '{section}.{key}'.")
+        _check_value(f"{section}.{key}", settings[key], expected_type, minimum, maximum)
+
+    execution_mode = config['cnn_model_settings'].get('execution_mode', 'thread')
+    if execution_mode not in CNN_EXECUTION_MODES:
+        raise ConfigValidationError(
+            f"'cnn_model_settings.execution_mode' must be one of {CNN_EXECUTION_MODES}, got {execution_mode!r}.")
+    _validate_worker_settings(config['cnn_model_settings'])
+
+    cascade = config['hybrid_settings'].get('cnn_cascade', {})
+    if not isinstance(cascade, dict):
+        raise ConfigValidationError("'hybrid_settings.cnn_cascade' must be a mapping.")
+    _check_value("hybrid_settings.cnn_cascade.enabled", cascade.get('enabled', False), bool, None, None)
+    band = cascade.get('ambiguous_band', [0.3, 1.0])
+    if not (isinstance(band, list) and len(band) == 2 and all(isinstance(v, (int, float)) for v in band)
+            and 0 <= band[0] <= band[1]):
+        raise ConfigValidationError(
+            f"'hybrid_settings.cnn_cascade.ambiguous_band' must be [low, high] with 0 <= low <= high, got {band!r}.")
+    _check_value("hybrid_settings.cnn_cascade.trend_frames", cascade.get('trend_frames', 15), int, 1, None)
+    _check_value("hybrid_settings.cnn_cascade.trend_min_rise", cascade.get('trend_min_rise', 0.1), float, 0.0, None)
+    _check_value("hybrid_settings.cnn_cascade.probability_smoothing",
+                 cascade.get('probability_smoothing', 0.5), float, 0.01, 1.0)
+
+    _validate_resources(config.get('resources'))
+
+    webrtc = config.get('webrtc', {})
+    if not isinstance(webrtc, dict):
+        raise ConfigValidationError("'webrtc' must be a mapping.")
+    ice_backend = webrtc.get('ice_backend', 'static')
+    if ice_backend not in ICE_BACKENDS:
+        raise ConfigValidationError(f"'webrtc.ice_backend' must be one of {ICE_BACKENDS}, got {ice_backend!r}.")
+
+    weights = config['hybrid_settings'].get('weights')
+    if not isinstance(weights, dict):
+        raise ConfigValidationError("Missing section 'hybrid_settings.weights'.")
+    for key in WEIGHT_KEYS:
+        if key not in weights:
+            raise ConfigValidationError(f"Missing setting 'hybrid_settings.weights.{key}'.")
+        _check_value(f"hybrid_settings.weights.{key}", weights[key], float, 0.0, None)
+
+
+def _validate_worker_settings(settings):
+    """Checks the optional CNN worker settings used by `execution_mode: "process"`."""
+    _check_value("cnn_model_settings.worker_ring_slots", settings.get('worker_ring_slots', 4), int, 1, None)
+    for key, default in (("worker_timeout_seconds", 10.0), ("worker_restart_backoff_seconds", 5.0)):
+        value = settings.get(key, default)
+        _check_value(f"cnn_model_settings.{key}", value, float, None, None)
+        if value <= 0:
+            raise ConfigValidationError(f"'cnn_model_settings.{key}' must be > 0, got {value}.")
+    size = settings.get('worker_max_frame_size', [3840, 2160])
+    if not (isinstance(size, list) and len(size) == 2
+            and all(isinstance(v, int) and not isinstance(v, bool) and v > 0 for v in size)):
+        raise ConfigValidationError(
+            f"'cnn_model_settings.worker_max_frame_size' must be [width, height] with positive ints, got {size!r}.")
+
+
+def _validate_resources(resources):
+    """Checks the optional `resources` section; unset values keep library defaults."""
+    if resources is None:
+        return
+    if not isinstance(resources, dict):
+        raise ConfigValidationError("'resources' must be a mapping.")
+    for key in RESOURCE_THREAD_KEYS:
+        if resources.get(key) is not None:
+            _check_value(f"resources.{key}", resources[key], int, 1, None)
+
+    affinity = resources.get('cpu_affinity')
+    if affinity is None:
+        return
+    if not isinstance(affinity, dict):
+        raise ConfigValidationError(
+            f"'resources.cpu_affinity' must map a stage to a list of core ids, got {affinity!r}.")
+    for stage, cores in affinity.items():
+        if stage not in AFFINITY_STAGES:
+            raise ConfigValidationError(
+                f"'resources.cpu_affinity' stage must be one of {AFFINITY_STAGES}, got {stage!r}.")
+        if cores is None:
+            continue
+        if not isinstance(cores, list):
+            raise ConfigValidationError(f"'resources.cpu_affinity.{stage}' must be a list of core ids, got {cores!r}.")
+        for core in cores:
+            _check_value(f"resources.cpu_affinity.{stage}", core, int, 0, None)
+
+
+def load_config(path):
+    """Reads and validates a configuration file."""
+    with open(path, 'r') as f:
+        config = yaml.safe_load(f)
+    validate_config(config)
+    return config
+
+
+class ConfigService:
+    """
+    Watches `config.yaml` and publishes validated snapshots of it.
+
+    Each snapshot is an immutable-by-convention dict tagged with a version
+    number. Consumers (the video processors) compare versions between frames
+    and apply a newer snapshot in one step, so a frame is never evaluated
+    against a mix of old and new settings. Invalid edits are rejected and the
+    last good snapshot stays active.
+    """
+    def __init__(self, path, poll_interval=1.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._config = load_config(path)
+        self._version = 1
+        self._mtime = self._read_mtime()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def config(self):
+        """The latest valid configuration. Callers must not mutate it."""
+        with self._lock:
+            return self._config
+
+    @property
+    def version(self):
+        with self._lock:
+            return self._version
+
+    def snapshot(self):
+        """Returns (version, config) as a consistent pair."""
+        with self._lock:
+            return self._version, self._config
+
+    def _read_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload(self):
+        """
+        Re-reads the config file. Returns True if a new, valid configuration
+        was published.
+        """
+        try:
+            new_config = load_config(self.path)
+        except (OSError, yaml.YAMLError, ConfigValidationError) as e:
+            print(f"Warning: Ignoring invalid config change in '{self.path}': {e}")
+            return False
+        except Exception as e:
+            # A validator bug must not stop the watcher thread for good.
+            print(f"Warning: Ignoring config change in '{self.path}' that could not be validated "
+                  f"({type(e).__name__}: {e})")
+            return False
+
+        with self._lock:
+            if new_config == self._config:
+                return False
+            resources_changed = new_config.get('resources') != self._config.get('resources')
+            self._config = new_config
+            self._version += 1
+            version = self._version
+        print(f"Configuration reloaded from '{self.path}' (version {version}).")
+        if resources_changed:
+            # Thread pools and core sets are process-wide and applied once.
+            print(f"Warning: 'resources' changed in '{self.path}'; restart the app to apply it.")
+        return True
+
+    def _watch(self):
+        while not self._stop_event.wait(self.poll_interval):
+            mtime = self._read_mtime()
+            if mtime is not None and mtime != self._mtime:
+                self._mtime = mtime
+                self.reload()
+
+    def start(self):
+        """Starts the background file watcher (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._watch, name="config-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval * 2)
+            self._thread = None
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_config_service(path="config.yaml"):
+    """Returns the process-wide, already-started ConfigService for `path`."""
+    path = os.path.abspath(path)
+    with _services_lock:
+        service = _services.get(path)
+        if service is None:
+            service = ConfigService(path).start()
+            _services[path] = service
+        return service
+
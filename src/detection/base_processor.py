@@ -24,3 +24,20 @@ class BaseProcessor(ABC):
         """
         pass
 
+    @abstractmethod
+    def update_config(self, config):
+        """
+        Applies a new configuration to a running processor.
+
+        Lightweight settings (thresholds, weights) are swapped in place;
+        heavy resources such as models are only rebuilt when their own
+        settings change.
+
+        Args:
+            config: The full, already validated configuration dictionary.
+        """
+        pass
+
+    def close(self):
+        """Releases background resources (threads, worker processes). Optional."""
+        pass
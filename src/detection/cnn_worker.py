@@ -0,0 +1,262 @@
+# drive_paddy/detection/cnn_worker.py
+"""
+Out-of-process CNN inference.
+
+The worker process owns the dlib face detector and the EfficientNet model,
+so face detection, preprocessing and torch dispatch never compete with the
+geometric pipeline for the GIL. Frames are written into a ring of
+shared-memory slots sized from the frames actually submitted; only small
+(sequence, slot, shape) tuples cross the pipe, and results come back the
+same way. The worker runs the same
+detection and preprocessing code as `CnnProcessor`, so a frame gets the same
+drowsy probability in either execution mode.
+"""
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.detection.strategies.cnn_model import ModelState
+from src.runtime.resource_manager import ResourceManager
+
+# Upper bound (width, height) for the shared frame slots. Larger frames are
+# dropped rather than rescaled, since rescaling would change the face crop
+# the model sees.
+DEFAULT_MAX_FRAME_SIZE = (3840, 2160)
+
+
+def _worker_main(num_slots, settings, resource_settings, conn):
+    """Entry point of the worker process."""
+    # Pin before torch starts its thread pools so they inherit the core set.
+    resources = ResourceManager(resource_settings)
+    resources.pin_current_thread('cnn')
+    resources.apply()
+    import dlib
+    import torch
+    from src.detection.strategies.cnn_model import (
+        build_face_transform, detect_face, load_model, predict_drowsy_probability)
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model = load_model(settings['model_path'], device, settings.get('verify_checksum', False))
+    if model is None:
+        conn.send(("failed", settings['model_path']))
+        return
+
+    face_detector = dlib.get_frontal_face_detector()
+    transform = build_face_transform()
+
+    def predict(frame):
+        # Mirrors CnnProcessor.process_frame: no face means probability 0.
+        box = detect_face(face_detector, frame)
+        if box is None:
+            return 0.0
+        x1, y1, x2, y2 = box
+        return predict_drowsy_probability(model, transform, device, frame[y1:y2, x1:x2])
+
+    try:
+        face_detector(np.zeros((240, 320), dtype=np.uint8))
+        for _ in range(settings.get('warmup_iterations', 2)):
+            predict_drowsy_probability(model, transform, device, np.zeros((224, 224, 3), dtype=np.uint8))
+    except Exception as e:
+        # Reported as a load failure so the parent stops restarting the worker.
+        print(f"Error warming up CNN model in worker: {e}")
+        conn.send(("failed", settings['model_path']))
+        return
+    conn.send(("ready",))
+
+    # The parent sends "attach" before the first frame and whenever it grows
+    # the ring. Spawned children share the parent's resource tracker, and the
+    # parent unlinks every segment it replaces.
+    shm, slots = None, None
+    try:
+        while True:
+            message = conn.recv()
+            if message[0] == "infer":
+                _, seq, slot, shape = message
+                frame = slots[slot, :int(np.prod(shape))].reshape(shape).copy()
+                conn.send(("result", seq, slot, predict(frame)))
+            elif message[0] == "attach":
+                _, shm_name, slot_bytes = message
+                if shm is not None:
+                    del slots
+                    shm.close()
+                shm = shared_memory.SharedMemory(name=shm_name)
+                slots = np.ndarray((num_slots, slot_bytes), dtype=np.uint8, buffer=shm.buf)
+            elif message[0] == "stop":
+                break
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        if shm is not None:
+            del slots
+            shm.close()
+
+
+class CnnWorkerClient:
+    """
+    Parent-side handle for the CNN worker process.
+
+    All methods are meant to be called from the single thread that processes
+    frames. `submit` never blocks: if every slot is still in flight the frame
+    is dropped and the last result keeps being used. The shared-memory ring is
+    allocated on the first submit and regrown, without restarting the worker,
+    when a larger frame arrives.
+    """
+    def __init__(self, config):
+        self.settings = config['cnn_model_settings']
+        self.resource_settings = config.get('resources')
+        self.num_slots = self.settings.get('worker_ring_slots', 4)
+        self.timeout = self.settings.get('worker_timeout_seconds', 10.0)
+        self.restart_backoff = self.settings.get('worker_restart_backoff_seconds', 5.0)
+        max_width, max_height = self.settings.get('worker_max_frame_size', DEFAULT_MAX_FRAME_SIZE)
+        self.max_slot_bytes = max_width * max_height * 3
+        self.slot_bytes = 0
+        self.dropped_oversize = 0
+        self._warned_shapes = set()
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._shm = None
+        self._slots = None
+        self.process = None
+        self._conn = None
+        self.state = ModelState.LOADING
+        self.restarts = 0
+        self._last_start = 0.0
+        self._start()
+
+    @property
+    def is_ready(self):
+        return self.state == ModelState.READY
+
+    def _start(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        self.process = self._ctx.Process(
+            target=_worker_main, args=(self.num_slots, self.settings, self.resource_settings, child_conn),
+            name="cnn-worker", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        if self._shm is not None:
+            # Sent first, so a restarted worker attaches before any frame arrives.
+            self._conn.send(("attach", self._shm.name, self.slot_bytes))
+        self._in_flight = {}  # slot -> (seq, submit time)
+        self._seq = 0
+        self._last_start = time.monotonic()
+        self.state = ModelState.LOADING
+
+    def _terminate(self):
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=2.0)
+        if self._conn is not None:
+            self._conn.close()
+        self.process = None
+        self._conn = None
+
+    def restart(self):
+        print("Restarting CNN worker process...")
+        self._terminate()
+        self.restarts += 1
+        self._start()
+
+    def check_health(self):
+        """Restarts the worker if it died or stopped answering."""
+        if self.state == ModelState.FAILED:
+            return
+        now = time.monotonic()
+        dead = self.process is None or not self.process.is_alive()
+        oldest = min((sent for _, sent in self._in_flight.values()), default=None)
+        hung = oldest is not None and now - oldest > self.timeout
+        if (dead or hung) and now - self._last_start > self.restart_backoff:
+            self.restart()
+
+    def _grow_ring(self, slot_bytes):
+        """Replaces the shared-memory ring with one whose slots hold `slot_bytes`."""
+        old_shm, old_slots = self._shm, self._slots
+        self._shm = shared_memory.SharedMemory(create=True, size=self.num_slots * slot_bytes)
+        self._slots = np.ndarray((self.num_slots, slot_bytes), dtype=np.uint8, buffer=self._shm.buf)
+        self.slot_bytes = slot_bytes
+        try:
+            self._conn.send(("attach", self._shm.name, slot_bytes))
+        except (OSError, BrokenPipeError):
+            pass  # The restarted worker is attached in _start.
+        if old_shm is not None:
+            # Nothing is in flight, so the worker never reads the old ring again.
+            del old_slots
+            old_shm.close()
+            old_shm.unlink()
+
+    def submit(self, frame):
+        """Copies a BGR frame into a free slot and queues it. Returns False if dropped."""
+        if not self.is_ready or frame.size == 0:
+            return False
+        if frame.nbytes > self.slot_bytes:
+            if frame.nbytes > self.max_slot_bytes:
+                self.dropped_oversize += 1
+                if frame.shape not in self._warned_shapes:
+                    self._warned_shapes.add(frame.shape)
+                    print(f"Warning: {frame.shape[1]}x{frame.shape[0]} frames exceed "
+                          "'worker_max_frame_size'; the CNN worker skips them.")
+                return False
+            if self._in_flight:
+                return False  # Grow once the current ring has drained.
+            self._grow_ring(frame.nbytes)
+        free = [slot for slot in range(self.num_slots) if slot not in self._in_flight]
+        if not free:
+            return False
+        slot = free[0]
+        self._slots[slot, :frame.size] = frame.reshape(-1)
+        self._seq += 1
+        try:
+            self._conn.send(("infer", self._seq, slot, frame.shape))
+        except (OSError, BrokenPipeError):
+            return False
+        self._in_flight[slot] = (self._seq, time.monotonic())
+        return True
+
+    def poll(self):
+        """
+        Drains pending messages without blocking.
+
+        Returns:
+            The drowsy-class probability of the newest completed request, or
+            None if nothing new arrived.
+        """
+        latest = None
+        try:
+            while self._conn is not None and self._conn.poll(0):
+                message = self._conn.recv()
+                if message[0] == "result":
+                    _, seq, slot, probability = message
+                    self._in_flight.pop(slot, None)
+                    latest = probability
+                elif message[0] == "ready":
+                    self.state = ModelState.READY
+                    print(f"CNN worker ready after {time.monotonic() - self._last_start:.2f}s.")
+                elif message[0] == "failed":
+                    self.state = ModelState.FAILED
+                    print(f"Error: CNN worker could not load model '{message[1]}'.")
+        except (EOFError, OSError):
+            pass  # The worker died; check_health will restart it.
+        return latest
+
+    def update_config(self, config):
+        new_settings = config['cnn_model_settings']
+        restart = new_settings['model_path'] != self.settings['model_path']
+        self.settings = new_settings
+        if restart:
+            self.restart()
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.send(("stop",))
+            except (OSError, BrokenPipeError):
+                pass
+        self._terminate()
+        if self._shm is not None:
+            self._slots = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
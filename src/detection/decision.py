@@ -0,0 +1,115 @@
+# drive_paddy/detection/decision.py
+"""
+Decision logic shared by the live processors and the offline replay/tuning
+tools. Nothing in here touches a vision model, so recorded measurement
+streams can be pushed through exactly the same rules as live frames.
+"""
+
+
+class GeometricEvaluator:
+    """
+    Turns per-frame geometric measurements (EAR, MAR, pitch, yaw) into
+    drowsiness indicators using the thresholds and consecutive-frame counters
+    from `geometric_settings`.
+    """
+    def __init__(self, settings):
+        self.settings = settings
+
+        # State counters
+        self.counters = {
+            "eye_closure": 0, "yawning": 0,
+            "head_nod": 0, "looking_away": 0
+        }
+
+    def evaluate(self, ear, mar, pitch, yaw):
+        """Updates the counters with one frame of measurements and returns the indicators."""
+        drowsiness_indicators = {
+            "eye_closure": False, "yawning": False,
+            "head_nod": False, "looking_away": False,
+            "details": {"EAR": ear, "MAR": mar, "Pitch": pitch, "Yaw": yaw}
+        }
+
+        # --- Eye Closure Detection (EAR) ---
+        if ear < self.settings['eye_ar_thresh']:
+            self.counters['eye_closure'] += 1
+            if self.counters['eye_closure'] >= self.settings['eye_ar_consec_frames']:
+                drowsiness_indicators['eye_closure'] = True
+        else:
+            self.counters['eye_closure'] = 0
+
+        # --- Yawn Detection (MAR) ---
+        if mar > self.settings['yawn_mar_thresh']:
+            self.counters['yawning'] += 1
+            if self.counters['yawning'] >= self.settings['yawn_consec_frames']:
+                drowsiness_indicators['yawning'] = True
+        else:
+            self.counters['yawning'] = 0
+
+        # --- Head Pose ---
+        if pitch > self.settings['head_nod_thresh']:
+            self.counters['head_nod'] += 1
+            if self.counters['head_nod'] >= self.settings['head_pose_consec_frames']:
+                drowsiness_indicators['head_nod'] = True
+        else:
+            self.counters['head_nod'] = 0
+
+        if abs(yaw) > self.settings['head_look_away_thresh']:
+            self.counters['looking_away'] += 1
+            if self.counters['looking_away'] >= self.settings['head_pose_consec_frames']:
+                drowsiness_indicators['looking_away'] = True
+        else:
+            self.counters['looking_away'] = 0
+
+        return drowsiness_indicators
+
+    @staticmethod
+    def no_face():
+        """Indicators for a frame without a detected face; counters are left untouched."""
+        return {
+            "eye_closure": False, "yawning": False,
+            "head_nod": False, "looking_away": False, "details": {}
+        }
+
+def score_indicators(geo_indicators, cnn_indicators, weights):
+    """
+    Combines geometric and CNN indicators into a weighted drowsiness score.
+
+    Returns:
+        A tuple of (score, active_alerts), where active_alerts maps a readable
+        alert name to the measurement that triggered it.
+    """
+    score = 0
+    active_alerts = {}
+
+    if geo_indicators.get("eye_closure"):
+        score += weights['eye_closure']
+        active_alerts['Eyes Closed'] = geo_indicators['details'].get('EAR', 0)
+    if geo_indicators.get("yawning"):
+        score += weights['yawning']
+        active_alerts['Yawning'] = geo_indicators['details'].get('MAR', 0)
+    if geo_indicators.get("head_nod"):
+        score += weights['head_nod']
+        active_alerts['Head Nod'] = geo_indicators['details'].get('Pitch', 0)
+    if geo_indicators.get("looking_away"):
+        score += weights['looking_away']
+        active_alerts['Looking Away'] = geo_indicators['details'].get('Yaw', 0)
+    if cnn_indicators.get("cnn_prediction"):
+        score += weights['cnn_prediction']
+        active_alerts['CNN Alert'] = 'Active'
+
+    return score, active_alerts
+
+
+def geometric_partial_score(counters, settings, weights):
+    """
+    Graded geometric score used to gate the CNN. Each signal contributes its
+    weight scaled by how far its consecutive-frame counter has progressed
+    toward firing, so the score rises smoothly before any indicator fires.
+    """
+    required_frames = {
+        "eye_closure": settings['eye_ar_consec_frames'],
+        "yawning": settings['yawn_consec_frames'],
+        "head_nod": settings['head_pose_consec_frames'],
+        "looking_away": settings['head_pose_consec_frames'],
+    }
+    return sum(weights[name] * min(counters[name] / frames, 1.0) for name, frames in required_frames.items())
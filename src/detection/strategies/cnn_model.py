@@ -8,93 +8,227 @@ import cv2
 import dlib
 from PIL import Image
 import os
+import threading
+import time
+
+from src.runtime.resource_manager import get_resource_manager
+from src.detection.weight_format import MAPPED_WEIGHTS_SUFFIX, mapped_weights_path, load_mapped_weights
+
+
+def _build_model():
+    """Builds the EfficientNet-B7 structure with a 2-class classifier head."""
+    model = efficientnet_b7()
+    # Modify the final classifier layer to match the number of output classes (e.g., 2: drowsy, not_drowsy)
+    num_ftrs = model.classifier[1].in_features
+    model.classifier[1] = torch.nn.Linear(num_ftrs, 2) # Assuming 2 output classes
+    return model
+
+
+def build_face_transform():
+    """The preprocessing applied to face crops during training."""
+    return transforms.Compose([
+        transforms.Resize((224, 224)),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+    ])
+
+
+def detect_face(face_detector, frame):
+    """Returns the (x1, y1, x2, y2) dlib box of the first face with a non-empty crop, or None."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    for face in face_detector(gray):
+        x1, y1, x2, y2 = face.left(), face.top(), face.right(), face.bottom()
+        if frame[y1:y2, x1:x2].size > 0:
+            return x1, y1, x2, y2
+    return None
+
+
+def predict_drowsy_probability(model, transform, device, face_crop):
+    """Runs the model on a BGR face crop and returns the softmax probability of 'drowsy'."""
+    pil_image = Image.fromarray(cv2.cvtColor(face_crop, cv2.COLOR_BGR2RGB))
+    image_tensor = transform(pil_image).unsqueeze(0).to(device)
+    with torch.no_grad():
+        outputs = model(image_tensor)
+        # Assuming class 1 is 'drowsy' and class 0 is 'not_drowsy'
+        return torch.softmax(outputs, dim=1)[0, 1].item()
+
+
+def load_model(model_path, device, verify_checksum=False):
+    """
+    Loads the EfficientNet-B7 model and custom weights.
+
+    A mapped weight file (see `download_model.py`) next to the checkpoint is
+    preferred: the model is built on the meta device and its parameters point
+    straight into the shared, read-mostly file mapping instead of being
+    unpickled into private memory. The `.pth` checkpoint is the fallback, and
+    is used instead when the mapped file is older than it (the checkpoint was
+    replaced without re-running the conversion) or fails its integrity checks.
+    """
+    if model_path.endswith(MAPPED_WEIGHTS_SUFFIX):
+        mapped_path, checkpoint_path = model_path, None
+    else:
+        mapped_path, checkpoint_path = mapped_weights_path(model_path), model_path
+    has_mapped = os.path.exists(mapped_path)
+    has_checkpoint = checkpoint_path is not None and os.path.exists(checkpoint_path)
+    if not has_mapped and not has_checkpoint:
+        print(f"Error: Model file not found at {model_path}")
+        print("Please run 'python download_model.py' first.")
+        return None
+
+    if has_mapped and has_checkpoint and os.path.getmtime(mapped_path) < os.path.getmtime(checkpoint_path):
+        print(f"Warning: '{mapped_path}' is older than '{checkpoint_path}'; ignoring it. "
+              "Re-run 'python download_model.py' to regenerate it.")
+        has_mapped = False
+
+    try:
+        model = None
+        if has_mapped:
+            try:
+                state_dict = load_mapped_weights(mapped_path, verify=verify_checksum)
+            except ValueError as e:
+                if not has_checkpoint:
+                    raise
+                print(f"Warning: {e} Falling back to '{checkpoint_path}'.")
+            else:
+                with torch.device("meta"):
+                    model = _build_model()
+                model.load_state_dict(state_dict, assign=True)
+                source = mapped_path
+        if model is None:
+            model = _build_model()
+            model.load_state_dict(torch.load(checkpoint_path, map_location=device))
+            source = checkpoint_path
+        model.to(device)
+        model.eval() # Set the model to evaluation mode
+        print(f"CNN Model '{source}' loaded successfully on {device}.")
+        return model
+    except Exception as e:
+        print(f"Error loading CNN model: {e}")
+        return None
+
+
+class ModelState:
+    """Readiness states of the background-loaded CNN model."""
+    LOADING = "loading"
+    WARMING_UP = "warming_up"
+    READY = "ready"
+    FAILED = "failed"
+
 
 class CnnProcessor(BaseProcessor):
     """
     Drowsiness detection using a pre-trained EfficientNet-B7 model.
+
+    The model is loaded and warmed up on a background thread so construction
+    returns immediately. Until it is ready, `process_frame` reports no CNN
+    prediction and callers can check `is_ready` to fall back to other signals.
     """
     def __init__(self, config):
         self.settings = config['cnn_model_settings']
         self.model_path = self.settings['model_path']
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.resources = get_resource_manager(config)
         
         # Initialize dlib for face detection
         self.face_detector = dlib.get_frontal_face_detector()
         
-        # Load the model
-        self.model = self._load_model()
-        
         # Define image transformations
-        self.transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
-        ])
-
-    def _load_model(self):
-        """Loads the EfficientNet-B7 model and custom weights."""
-        if not os.path.exists(self.model_path):
-            print(f"Error: Model file not found at {self.model_path}")
-            print("Please run 'python download_model.py' first.")
-            return None
-            
+        self.transform = build_face_transform()
+
+        # Load the model in the background
+        self.model = None
+        self.state = ModelState.LOADING
+        self._ready = threading.Event()
+        self._load_generation = 0
+        self._start_loading()
+
+    @property
+    def is_ready(self):
+        return self.model is not None
+
+    def wait_until_ready(self, timeout=None):
+        """Blocks until a load attempt finishes. Returns True if a model is being served."""
+        self._ready.wait(timeout)
+        return self.is_ready
+
+    def update_config(self, config):
+        new_settings = config['cnn_model_settings']
+        reload_model = new_settings['model_path'] != self.model_path
+        self.settings = new_settings
+        if reload_model:
+            # The current model keeps serving until the new one is warmed up.
+            self.model_path = new_settings['model_path']
+            self._start_loading()
+
+    def _start_loading(self):
+        self._load_generation += 1
+        self._ready.clear()
+        self.state = ModelState.LOADING
+        threading.Thread(
+            target=self._load_in_background, args=(self._load_generation, self.model_path),
+            name="cnn-model-loader", daemon=True).start()
+
+    def _load_in_background(self, generation, model_path):
+        # Torch worker threads created during warm-up inherit this affinity.
+        self.resources.pin_current_thread('cnn')
+        start_time = time.perf_counter()
         try:
-            # Initialize the model structure
-            model = efficientnet_b7()
-            # Modify the final classifier layer to match the number of output classes (e.g., 2: drowsy, not_drowsy)
-            num_ftrs = model.classifier[1].in_features
-            model.classifier[1] = torch.nn.Linear(num_ftrs, 2) # Assuming 2 output classes
-
-            # Load the saved weights
-            model.load_state_dict(torch.load(self.model_path, map_location=self.device))
-            model.to(self.device)
-            model.eval() # Set the model to evaluation mode
-            print(f"CNN Model '{self.model_path}' loaded successfully on {self.device}.")
-            return model
+            model = self._load_model(model_path)
+            if generation != self._load_generation:
+                return  # A newer load superseded this one.
+            if model is None:
+                self.state = ModelState.FAILED
+                return
+
+            self.state = ModelState.WARMING_UP
+            self._warm_up(model)
+            if generation != self._load_generation:
+                return
+
+            self.model = model
+            self.state = ModelState.READY
+            print(f"CNN model ready after {time.perf_counter() - start_time:.2f}s (load + warm-up).")
         except Exception as e:
-            print(f"Error loading CNN model: {e}")
-            return None
+            print(f"Error preparing CNN model '{model_path}': {e}")
+            if generation == self._load_generation:
+                self.state = ModelState.FAILED
+        finally:
+            # Waiters are only released by the load they are waiting for.
+            if generation == self._load_generation:
+                self._ready.set()
+
+    def _warm_up(self, model):
+        """Runs dummy inferences so the first real frame does not pay one-time costs."""
+        iterations = self.settings.get('warmup_iterations', 2)
+        dummy_face = np.zeros((224, 224, 3), dtype=np.uint8)
+        self.face_detector(np.zeros((240, 320), dtype=np.uint8))
+        for _ in range(iterations):
+            predict_drowsy_probability(model, self.transform, self.device, dummy_face)
+
+    def _load_model(self, model_path):
+        return load_model(model_path, self.device, self.settings.get('verify_checksum', False))
 
     def process_frame(self, frame):
         """
         Processes a frame to detect drowsiness using the CNN model.
         """
-        if self.model is None:
-            return frame, {"cnn_prediction": False}
+        model = self.model
+        if model is None:
+            return frame, {"cnn_prediction": False, "cnn_probability": None}
 
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.face_detector(gray)
         is_drowsy_prediction = False
+        drowsy_probability = 0.0
 
-        for face in faces:
-            x1, y1, x2, y2 = face.left(), face.top(), face.right(), face.bottom()
-            
-            # Crop the face from the frame
-            face_crop = frame[y1:y2, x1:x2]
-            
-            # Ensure the crop is valid before processing
-            if face_crop.size == 0:
-                continue
-                
-            # Convert to PIL Image and apply transformations
-            pil_image = Image.fromarray(cv2.cvtColor(face_crop, cv2.COLOR_BGR2RGB))
-            image_tensor = self.transform(pil_image).unsqueeze(0).to(self.device)
-            
-            # Perform inference
-            with torch.no_grad():
-                outputs = self.model(image_tensor)
-                _, preds = torch.max(outputs, 1)
-                # Assuming class 1 is 'drowsy' and class 0 is 'not_drowsy'
-                print(preds)
-                if preds.item() == 1:
-                    is_drowsy_prediction = True
+        # Process only the first detected face
+        box = detect_face(self.face_detector, frame)
+        if box is not None:
+            x1, y1, x2, y2 = box
+            drowsy_probability = predict_drowsy_probability(model, self.transform, self.device, frame[y1:y2, x1:x2])
+            is_drowsy_prediction = drowsy_probability >= self.settings['confidence_thresh']
 
             # Draw bounding box for visualization
             cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 255, 0), 2)
             label = "Drowsy" if is_drowsy_prediction else "Awake"
-            cv2.putText(frame, f"CNN: {label}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
-            
-            # Process only the first detected face
-            break
-            
-        return frame, {"cnn_prediction": is_drowsy_prediction}
+            cv2.putText(frame, f"CNN: {label} ({drowsy_probability:.2f})", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
+
+        return frame, {"cnn_prediction": is_drowsy_prediction, "cnn_probability": drowsy_probability}
@@ -2,8 +2,12 @@
 from src.detection.base_processor import BaseProcessor
 from src.detection.strategies.geometric import GeometricProcessor
 from src.detection.strategies.cnn_model import CnnProcessor
+from src.detection.cnn_worker import CnnWorkerClient
+from src.detection.decision import score_indicators, geometric_partial_score
+from src.runtime.resource_manager import get_resource_manager
 import cv2
 import concurrent.futures
+from collections import deque
 
 class HybridProcessor(BaseProcessor):
     """
@@ -13,57 +17,149 @@ class HybridProcessor(BaseProcessor):
     """
     def __init__(self, config):
         self.geometric_processor = GeometricProcessor(config)
-        self.cnn_processor = CnnProcessor(config)
+
+        # "thread" runs the CNN next to FaceMesh in this process; "process"
+        # moves it to a worker process fed with frames via shared memory.
+        self.cnn_execution = config['cnn_model_settings'].get('execution_mode', 'thread')
+        if self.cnn_execution == 'process':
+            self.cnn_processor = CnnWorkerClient(config)
+        else:
+            self.cnn_processor = CnnProcessor(config)
+        self.cnn_settings = config['cnn_model_settings']
         self.weights = config['hybrid_settings']['weights']
         self.alert_threshold = config['hybrid_settings']['alert_threshold']
+        self.cascade = config['hybrid_settings'].get('cnn_cascade', {})
         self.active_alerts = {}
         
         # --- Performance Optimization ---
         self.frame_counter = 0
-        self.cnn_process_interval = 10  # Run CNN every 10 frames
+        self.cnn_process_interval = 10  # Run CNN at most every 10 frames
+        self.frames_since_cnn = self.cnn_process_interval
+        self.cnn_invocations = 0
         self.last_cnn_indicators = {"cnn_prediction": False} # Cache the last CNN result
 
-        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        # --- CNN Cascade State ---
+        self.partial_score = 0.0
+        self.partial_history = deque(maxlen=self.cascade.get('trend_frames', 15) + 1)
+        self.smoothed_cnn_probability = 0.0
 
-    def process_frame(self, frame):
-        self.frame_counter += 1
+        self.resources = get_resource_manager(config)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.resources.executor_workers)
+
+    def update_config(self, config):
+        self.geometric_processor.update_config(config)
+        self.cnn_processor.update_config(config)
+        self.cnn_settings = config['cnn_model_settings']
+        self.weights = config['hybrid_settings']['weights']
+        self.alert_threshold = config['hybrid_settings']['alert_threshold']
+        self.cascade = config['hybrid_settings'].get('cnn_cascade', {})
+        trend_frames = self.cascade.get('trend_frames', 15) + 1
+        if trend_frames != self.partial_history.maxlen:
+            self.partial_history = deque(self.partial_history, maxlen=trend_frames)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        if self.cnn_execution == 'process':
+            self.cnn_processor.close()
+
+    def _cnn_wanted(self):
+        """
+        Decides whether the CNN should run on this frame.
+
+        Without the cascade the CNN simply runs every `cnn_process_interval`
+        frames. With it, the CNN only runs while the geometric partial score
+        is inside the ambiguous band or rising toward `alert_threshold`; while
+        the driver is clearly alert it is skipped and its state is cleared.
+        """
+        if not self.cascade.get('enabled', False):
+            return self.frames_since_cnn >= self.cnn_process_interval
+
+        low, high = self.cascade.get('ambiguous_band', [0.3, 1.0])
+        score = self.partial_score
+        ambiguous = low * self.alert_threshold <= score < high * self.alert_threshold
+        oldest = self.partial_history[0] if self.partial_history else score
+        trending = score > 0 and score - oldest >= self.cascade.get('trend_min_rise', 0.1) * self.alert_threshold
 
+        if not ambiguous and not trending and score < low * self.alert_threshold:
+            # Clearly alert: drop any stale CNN opinion.
+            self.smoothed_cnn_probability = 0.0
+            self.last_cnn_indicators = {"cnn_prediction": False}
+            return False
+        return (ambiguous or trending) and self.frames_since_cnn >= self.cnn_process_interval
+
+    def _record_cnn_probability(self, probability):
+        """Thresholds a new drowsy probability, smoothing it over time in cascade mode."""
+        if probability is None:
+            return
+        if self.cascade.get('enabled', False):
+            alpha = self.cascade.get('probability_smoothing', 0.5)
+            self.smoothed_cnn_probability = alpha * probability + (1 - alpha) * self.smoothed_cnn_probability
+            probability = self.smoothed_cnn_probability
+        self.last_cnn_indicators = {
+            "cnn_prediction": probability >= self.cnn_settings['confidence_thresh'],
+            "cnn_probability": probability,
+        }
+
+    def _update_partial_score(self):
+        self.partial_score = geometric_partial_score(
+            self.geometric_processor.counters, self.geometric_processor.settings, self.weights)
+        self.partial_history.append(self.partial_score)
+
+    def _run_in_threads(self, frame):
         # --- Concurrent Execution ---
         # The geometric processor runs on every frame.
-        geo_future = self.executor.submit(self.geometric_processor.process_frame, frame.copy())
+        geo_future = self.executor.submit(
+            self.resources.run_pinned, 'geometric', self.geometric_processor.process_frame, frame.copy())
 
-        # The CNN processor only runs on specified intervals.
-        if self.frame_counter % self.cnn_process_interval == 0:
-            cnn_future = self.executor.submit(self.cnn_processor.process_frame, frame.copy())
+        # The CNN processor only runs when wanted (see `_cnn_wanted`), and only
+        # once its model has finished loading; until then results are
+        # geometric-only. In cascade mode the decision uses the partial score
+        # of the previous frame so both models can still run concurrently.
+        run_cnn = self.cnn_processor.is_ready and self._cnn_wanted()
+        if run_cnn:
+            self.frames_since_cnn = 0
+            self.cnn_invocations += 1
+            cnn_future = self.executor.submit(
+                self.resources.run_pinned, 'cnn', self.cnn_processor.process_frame, frame.copy())
         
         # Get the result from the geometric processor.
         geo_frame, geo_indicators = geo_future.result()
+        self._update_partial_score()
 
         # Get the CNN result if it was run, otherwise use the cached result.
-        if self.frame_counter % self.cnn_process_interval == 0:
-            _, self.last_cnn_indicators = cnn_future.result()
+        if run_cnn:
+            _, cnn_indicators = cnn_future.result()
+            self._record_cnn_probability(cnn_indicators.get("cnn_probability"))
+        return geo_frame, geo_indicators
+
+    def _run_with_worker(self, frame):
+        # The geometric processor runs inline; the CNN worker is never waited on.
+        geo_frame, geo_indicators = self.geometric_processor.process_frame(frame)
+        self._update_partial_score()
+
+        worker = self.cnn_processor
+        worker.check_health()
+        self._record_cnn_probability(worker.poll())
+
+        if worker.is_ready and self._cnn_wanted():
+            if worker.submit(frame):
+                self.frames_since_cnn = 0
+                self.cnn_invocations += 1
+        return geo_frame, geo_indicators
+
+    def process_frame(self, frame):
+        self.frame_counter += 1
+        self.frames_since_cnn += 1
+
+        if self.cnn_execution == 'process':
+            geo_frame, geo_indicators = self._run_with_worker(frame)
+        else:
+            geo_frame, geo_indicators = self._run_in_threads(frame)
         
         cnn_indicators = self.last_cnn_indicators
         
         # Calculate weighted drowsiness score from the combined results.
-        score = 0
-        self.active_alerts.clear()
-
-        if geo_indicators.get("eye_closure"):
-            score += self.weights['eye_closure']
-            self.active_alerts['Eyes Closed'] = geo_indicators['details'].get('EAR', 0)
-        if geo_indicators.get("yawning"):
-            score += self.weights['yawning']
-            self.active_alerts['Yawning'] = geo_indicators['details'].get('MAR', 0)
-        if geo_indicators.get("head_nod"):
-            score += self.weights['head_nod']
-            self.active_alerts['Head Nod'] = geo_indicators['details'].get('Pitch', 0)
-        if geo_indicators.get("looking_away"):
-            score += self.weights['looking_away']
-            self.active_alerts['Looking Away'] = geo_indicators['details'].get('Yaw', 0)
-        if cnn_indicators.get("cnn_prediction"):
-            score += self.weights['cnn_prediction']
-            self.active_alerts['CNN Alert'] = 'Active'
+        score, self.active_alerts = score_indicators(geo_indicators, cnn_indicators, self.weights)
 
         # --- Visualization ---
         output_frame = geo_frame
@@ -75,6 +171,9 @@ class HybridProcessor(BaseProcessor):
             
         cv2.putText(output_frame, f"Score: {score:.2f}", (output_frame.shape[1] - 150, 30),
                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        if not self.cnn_processor.is_ready:
+            cv2.putText(output_frame, f"CNN: {self.cnn_processor.state}", (output_frame.shape[1] - 150, 55),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 165, 255), 1)
 
         alert_triggered = score >= self.alert_threshold
         if alert_triggered:
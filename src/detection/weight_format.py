@@ -0,0 +1,142 @@
+# drive_paddy/detection/weight_format.py
+"""
+Pickle-free, memory-mappable weight files.
+
+Layout:
+    8 bytes   magic (b"DPWT" + format version)
+    8 bytes   little-endian header length
+    N bytes   JSON header: tensor dtypes/shapes/offsets and a SHA-256 of the data
+    padding   to a 64-byte boundary
+    data      raw tensor bytes, each tensor 64-byte aligned
+
+Loading maps the file copy-on-write and builds tensors that point straight
+into the mapping, so no weights are copied and every process that maps the
+same file shares its physical pages through the OS page cache.
+"""
+import hashlib
+import json
+import os
+import struct
+import warnings
+
+import numpy as np
+import torch
+
+MAGIC = b"DPWT\x01\x00\x00\x00"
+MAPPED_WEIGHTS_SUFFIX = ".dpw"
+_ALIGNMENT = 64
+
+
+def _align(offset):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def mapped_weights_path(model_path):
+    """Returns the path of the mapped weight file that sits next to a `.pth` checkpoint."""
+    root, _ = os.path.splitext(model_path)
+    return root + MAPPED_WEIGHTS_SUFFIX
+
+
+def _tensor_bytes(tensor):
+    return tensor.detach().cpu().contiguous().reshape(-1).view(torch.uint8).numpy()
+
+
+def save_mapped_weights(state_dict, out_path):
+    """Writes a state dict in the mapped weight format and returns its data checksum."""
+    entries = {}
+    offset = 0
+    digest = hashlib.sha256()
+    for name, tensor in state_dict.items():
+        nbytes = tensor.numel() * tensor.element_size()
+        entries[name] = {
+            "dtype": str(tensor.dtype).replace("torch.", ""),
+            "shape": list(tensor.shape),
+            "offset": offset,
+            "nbytes": nbytes,
+        }
+        offset = _align(offset + nbytes)
+
+    # The header is written twice: once to size it, once with the final checksum.
+    header = {"tensors": entries, "data_size": offset, "data_sha256": "0" * 64}
+    header_size = len(json.dumps(header).encode("utf-8"))
+    data_start = _align(len(MAGIC) + 8 + header_size)
+
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.seek(data_start)
+        for name, tensor in state_dict.items():
+            data = _tensor_bytes(tensor)
+            f.seek(data_start + entries[name]["offset"])
+            f.write(data)
+            digest.update(data.tobytes())
+        f.truncate(data_start + offset)
+
+        header["data_sha256"] = digest.hexdigest()
+        header_bytes = json.dumps(header).encode("utf-8")
+        f.seek(0)
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+    os.replace(tmp_path, out_path)
+    return header["data_sha256"]
+
+
+def convert_checkpoint(pth_path, out_path=None):
+    """Converts a `.pth` state dict into the mapped weight format."""
+    out_path = out_path or mapped_weights_path(pth_path)
+    state_dict = torch.load(pth_path, map_location="cpu")
+    checksum = save_mapped_weights(state_dict, out_path)
+    return out_path, checksum
+
+
+def _read_header(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a mapped weight file (bad magic).")
+    size_bytes = f.read(8)
+    if len(size_bytes) != 8:
+        raise ValueError("Mapped weight file is truncated (incomplete header size).")
+    (header_size,) = struct.unpack("<Q", size_bytes)
+    header_bytes = f.read(header_size)
+    if len(header_bytes) != header_size:
+        raise ValueError("Mapped weight file is truncated (incomplete header).")
+    header = json.loads(header_bytes.decode("utf-8"))
+    header["data_start"] = _align(len(MAGIC) + 8 + header_size)
+    return header
+
+
+def verify_mapped_weights(path):
+    """Recomputes the data checksum. Returns True if it matches the header."""
+    with open(path, "rb") as f:
+        header = _read_header(f)
+        digest = hashlib.sha256()
+        for entry in header["tensors"].values():
+            f.seek(header["data_start"] + entry["offset"])
+            digest.update(f.read(entry["nbytes"]))
+    return digest.hexdigest() == header["data_sha256"]
+
+
+def load_mapped_weights(path, verify=False):
+    """
+    Maps a weight file and returns a state dict of tensors backed by the mapping.
+
+    Raises:
+        ValueError: If the file is malformed, truncated, or fails verification.
+    """
+    with open(path, "rb") as f:
+        header = _read_header(f)
+    expected_size = header["data_start"] + header["data_size"]
+    if os.path.getsize(path) != expected_size:
+        raise ValueError(f"Mapped weight file '{path}' is truncated or corrupted.")
+    if verify and not verify_mapped_weights(path):
+        raise ValueError(f"Checksum mismatch in mapped weight file '{path}'.")
+
+    # Copy-on-write: pages are shared until (if ever) a tensor is written to.
+    buffer = np.memmap(path, dtype=np.uint8, mode="c")
+    state_dict = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        for name, entry in header["tensors"].items():
+            start = header["data_start"] + entry["offset"]
+            raw = torch.from_numpy(buffer[start:start + entry["nbytes"]])
+            state_dict[name] = raw.view(getattr(torch, entry["dtype"])).reshape(entry["shape"])
+    return state_dict
@@ -0,0 +1,105 @@
+# drive_paddy/runtime/resource_manager.py
+"""
+Central CPU budget for torch, OpenCV and MediaPipe.
+
+Each library sizes its own thread pool to every core by default; with several
+sessions in one process that oversubscribes the machine. The `resources`
+section of config.yaml sets per-library thread counts, the HybridProcessor
+executor size, and optional core sets per pipeline stage. Thread counts are
+process-wide and applied once, so changing them needs a restart.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+DEFAULT_EXECUTOR_WORKERS = 2
+
+
+class ResourceManager:
+    """Applies thread limits and pins pipeline stages to core sets."""
+    def __init__(self, settings=None):
+        self.settings = settings or {}
+        self.affinity = {
+            stage: set(cores) for stage, cores in (self.settings.get('cpu_affinity') or {}).items() if cores
+        }
+        self._applied = False
+
+    @property
+    def executor_workers(self):
+        return self.settings.get('hybrid_executor_workers') or DEFAULT_EXECUTOR_WORKERS
+
+    def apply(self):
+        """Sets library thread counts for this process. Unset values keep library defaults."""
+        if self._applied:
+            return
+        self._applied = True
+
+        intra_op = self.settings.get('torch_intra_op_threads')
+        inter_op = self.settings.get('torch_inter_op_threads')
+        if intra_op:
+            # Read by OpenMP/MKL when they initialize, in case torch is not imported yet.
+            os.environ.setdefault('OMP_NUM_THREADS', str(intra_op))
+            os.environ.setdefault('MKL_NUM_THREADS', str(intra_op))
+        try:
+            import torch
+            if intra_op:
+                torch.set_num_threads(intra_op)
+            if inter_op:
+                torch.set_num_interop_threads(inter_op)
+        except ImportError:
+            pass
+        except RuntimeError as e:
+            # Inter-op threads can only be set before torch runs parallel work.
+            print(f"Warning: Could not set torch inter-op threads: {e}")
+
+        opencv_threads = self.settings.get('opencv_threads')
+        if opencv_threads is not None:
+            try:
+                import cv2
+                cv2.setNumThreads(opencv_threads)
+            except ImportError:
+                pass
+
+    def pin_current_thread(self, stage):
+        """Restricts the calling thread (and threads it starts later) to the stage's cores."""
+        cores = self.affinity.get(stage)
+        if cores and hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(0, cores)
+            except OSError as e:
+                print(f"Warning: Could not pin '{stage}' to cores {sorted(cores)}: {e}")
+
+    @contextmanager
+    def pinned(self, stage):
+        """Runs a block pinned to the stage's cores, then restores the previous affinity."""
+        if stage not in self.affinity or not hasattr(os, 'sched_getaffinity'):
+            yield
+            return
+        previous = os.sched_getaffinity(0)
+        self.pin_current_thread(stage)
+        try:
+            yield
+        finally:
+            os.sched_setaffinity(0, previous)
+
+    def run_pinned(self, stage, fn, *args):
+        """Calls `fn(*args)` pinned to the stage's cores; meant for executor tasks."""
+        with self.pinned(stage):
+            return fn(*args)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_resource_manager(config=None):
+    """
+    Returns the process-wide ResourceManager, creating and applying it from
+    `config['resources']` on first use.
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ResourceManager((config or {}).get('resources'))
+            _manager.apply()
+        return _manager
@@ -0,0 +1,139 @@
+# drive_paddy/tuning/replay.py
+"""
+Recording and replay of per-frame geometric measurements.
+
+A recording runs MediaPipe (and optionally the CNN) over a video once and
+stores the measurement stream. Replaying it pushes the stream through the
+same decision logic the live `HybridProcessor` uses, so a new configuration
+can be checked without any vision model.
+
+The CNN drowsy probability is recorded at the hybrid's fixed cadence and
+`confidence_thresh` is applied at replay time. Replay assumes
+`hybrid_settings.cnn_cascade` is disabled: cascade gating and probability
+smoothing depend on the live score and are not modeled.
+"""
+import numpy as np
+
+from src.detection.decision import GeometricEvaluator, score_indicators
+
+# Without the cascade, hybrid runs the CNN on the first frame and every 10
+# frames after it, holding the result in between.
+DEFAULT_CNN_INTERVAL = 10
+
+
+def record_stream(video_path, config, out_path, with_cnn=False, cnn_interval=DEFAULT_CNN_INTERVAL):
+    """
+    Runs the geometric (and optionally CNN) processors over a video file and
+    saves the per-frame measurement stream to a compressed `.npz` file.
+    """
+    import cv2
+    from src.detection.strategies.geometric import GeometricProcessor
+
+    geometric = GeometricProcessor(config)
+    cnn = None
+    if with_cnn:
+        from src.detection.strategies.cnn_model import CnnProcessor
+        cnn = CnnProcessor(config)
+        if not cnn.wait_until_ready():
+            raise RuntimeError(f"CNN model could not be loaded from '{cnn.model_path}'.")
+
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise IOError(f"Could not open video: {video_path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+
+    face, ear, mar, pitch, yaw, cnn_probability = [], [], [], [], [], []
+    # NaN until the CNN has run, so no confidence_thresh can fire it.
+    last_cnn = np.nan
+    frame_index = 0
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frame_index += 1
+
+        _, indicators = geometric.process_frame(frame)
+        details = indicators['details']
+        face.append('EAR' in details)
+        ear.append(details.get('EAR', 0.0))
+        mar.append(details.get('MAR', 0.0))
+        pitch.append(details.get('Pitch', 0.0))
+        yaw.append(details.get('Yaw', 0.0))
+
+        if cnn is not None and (frame_index - 1) % cnn_interval == 0:
+            _, cnn_indicators = cnn.process_frame(frame)
+            last_cnn = cnn_indicators['cnn_probability']
+        cnn_probability.append(last_cnn)
+    capture.release()
+
+    np.savez_compressed(
+        out_path,
+        fps=fps,
+        face=np.array(face, dtype=bool),
+        ear=np.array(ear, dtype=np.float32),
+        mar=np.array(mar, dtype=np.float32),
+        pitch=np.array(pitch, dtype=np.float32),
+        yaw=np.array(yaw, dtype=np.float32),
+        cnn_probability=np.array(cnn_probability, dtype=np.float32),
+    )
+    print(f"Recorded {frame_index} frames from '{video_path}' to '{out_path}'.")
+    return out_path
+
+
+def load_stream(path):
+    """Loads a recorded measurement stream into a dict of NumPy arrays."""
+    with np.load(path) as data:
+        stream = {key: data[key] for key in data.files}
+    stream['fps'] = float(stream['fps'])
+    return stream
+
+
+def cnn_predictions(stream, confidence_thresh):
+    """
+    Thresholds the recorded CNN probabilities into per-frame predictions.
+
+    Streams recorded before probabilities were stored only hold the
+    `cnn_prediction` booleans, already thresholded at record time; those are
+    returned unchanged.
+    """
+    if 'cnn_probability' not in stream:
+        return stream['cnn_prediction'].astype(bool)
+    with np.errstate(invalid='ignore'):
+        return stream['cnn_probability'] >= confidence_thresh
+
+
+def segments_to_mask(segments, num_frames, fps):
+    """Converts labeled (start_seconds, end_seconds) segments into a per-frame boolean mask."""
+    mask = np.zeros(num_frames, dtype=bool)
+    for start, end in segments:
+        first = max(int(round(start * fps)), 0)
+        last = min(int(round(end * fps)), num_frames)
+        mask[first:last] = True
+    return mask
+
+
+def replay_stream(stream, config):
+    """
+    Replays a recorded stream frame by frame through the live decision logic.
+
+    Returns:
+        A tuple of (scores, alerts) arrays, one entry per frame.
+    """
+    evaluator = GeometricEvaluator(config['geometric_settings'])
+    weights = config['hybrid_settings']['weights']
+    alert_threshold = config['hybrid_settings']['alert_threshold']
+    cnn = cnn_predictions(stream, config['cnn_model_settings']['confidence_thresh'])
+
+    num_frames = len(stream['face'])
+    scores = np.zeros(num_frames, dtype=np.float64)
+    for i in range(num_frames):
+        if stream['face'][i]:
+            geo_indicators = evaluator.evaluate(
+                float(stream['ear'][i]), float(stream['mar'][i]),
+                float(stream['pitch'][i]), float(stream['yaw'][i]))
+        else:
+            geo_indicators = GeometricEvaluator.no_face()
+        cnn_indicators = {"cnn_prediction": bool(cnn[i])}
+        scores[i], _ = score_indicators(geo_indicators, cnn_indicators, weights)
+
+    return scores, scores >= alert_threshold
@@ -0,0 +1,230 @@
+# drive_paddy/tuning/sweep.py
+"""
+Vectorized threshold and weight sweep over a recorded measurement stream.
+
+Every indicator is a pure function of its measurement series, threshold and
+consecutive-frame count, so each candidate setting is evaluated for the whole
+timeline at once. Frames are then reduced to a 5-bit pattern of which
+indicators fired; because the hybrid score only depends on that pattern,
+every weight/threshold combination is scored against 32 patterns instead of
+the full timeline, and precision/recall for all combinations come out of a
+single matrix product. `cnn_model_settings.confidence_thresh` is swept with
+the geometric settings, since it decides the CNN bit of each frame.
+"""
+import itertools
+
+import numpy as np
+
+from src.tuning.replay import cnn_predictions
+
+# Order matters: it matches the summation order in `score_indicators`.
+INDICATORS = ("eye_closure", "yawning", "head_nod", "looking_away", "cnn_prediction")
+
+GEOMETRIC_KEYS = (
+    "eye_ar_thresh", "eye_ar_consec_frames",
+    "yawn_mar_thresh", "yawn_consec_frames",
+    "head_nod_thresh", "head_look_away_thresh", "head_pose_consec_frames",
+)
+
+# Upper bound on the number of booleans materialized per chunk.
+_CHUNK_ELEMENTS = 4_000_000
+
+
+def expand_values(spec):
+    """Expands a grid entry: a scalar, a list, or a {start, stop, num} linspace."""
+    if isinstance(spec, dict):
+        return np.linspace(spec['start'], spec['stop'], int(spec['num'])).tolist()
+    if isinstance(spec, (list, tuple)):
+        return list(spec)
+    return [spec]
+
+
+def build_grid(config, grid_spec):
+    """
+    Merges a grid specification with the current config. Any parameter not
+    listed in the grid keeps its current config value.
+    """
+    geo_spec = grid_spec.get('geometric_settings', {})
+    cnn_spec = grid_spec.get('cnn_model_settings', {})
+    hybrid_spec = grid_spec.get('hybrid_settings', {})
+    weight_spec = hybrid_spec.get('weights', {})
+
+    geo = config['geometric_settings']
+    hybrid = config['hybrid_settings']
+    grid = {key: expand_values(geo_spec.get(key, geo[key])) for key in GEOMETRIC_KEYS}
+    grid['confidence_thresh'] = expand_values(
+        cnn_spec.get('confidence_thresh', config['cnn_model_settings']['confidence_thresh']))
+    for name in INDICATORS:
+        grid[name] = expand_values(weight_spec.get(name, hybrid['weights'][name]))
+    grid['alert_threshold'] = expand_values(hybrid_spec.get('alert_threshold', hybrid['alert_threshold']))
+    return grid
+
+
+def consecutive_run_lengths(condition):
+    """
+    For a (K, T) boolean matrix, returns how many consecutive frames up to and
+    including each frame satisfied the condition (the live counter value).
+    """
+    num_frames = condition.shape[1]
+    index = np.arange(1, num_frames + 1, dtype=np.int32)
+    last_reset = np.where(condition, 0, index)
+    np.maximum.accumulate(last_reset, axis=1, out=last_reset)
+    return index - last_reset
+
+
+def indicator_bank(values, thresholds, consec_frames, compare):
+    """
+    Evaluates one indicator for every (threshold, consec_frames) pair.
+
+    Returns:
+        A (len(thresholds) * len(consec_frames), T) boolean matrix, ordered
+        threshold-major.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)[:, None]
+    condition = compare(values.astype(np.float64)[None, :], thresholds)
+    runs = consecutive_run_lengths(condition)
+    consec = np.asarray(consec_frames, dtype=np.int32)
+    return (runs[:, None, :] >= consec[None, :, None]).reshape(-1, values.shape[0])
+
+
+def _pattern_counts(stream, grid, labels):
+    """
+    Counts, for every geometric and CNN threshold setting, how many labeled and unlabeled frames
+    fall into each of the 32 indicator patterns.
+    """
+    # Frames without a face hold the counters and fire nothing, so the banks
+    # are computed on face frames only.
+    face = stream['face'].astype(bool)
+    cnn_bank = np.array([cnn_predictions(stream, thresh) for thresh in grid['confidence_thresh']])
+    positive = labels[face]
+    faceless_labels = labels[~face]
+
+    eye = indicator_bank(stream['ear'][face], grid['eye_ar_thresh'], grid['eye_ar_consec_frames'], np.less)
+    yawn = indicator_bank(stream['mar'][face], grid['yawn_mar_thresh'], grid['yawn_consec_frames'], np.greater)
+    head_consec = grid['head_pose_consec_frames']
+    nod = indicator_bank(stream['pitch'][face], grid['head_nod_thresh'], head_consec, np.greater)
+    away = indicator_bank(np.abs(stream['yaw'][face]), grid['head_look_away_thresh'], head_consec, np.greater)
+
+    # Head nod and look-away share their consecutive-frame count.
+    n_consec = len(head_consec)
+    head_pairs = [
+        (i * n_consec + c, j * n_consec + c)
+        for i in range(len(grid['head_nod_thresh']))
+        for j in range(len(grid['head_look_away_thresh']))
+        for c in range(n_consec)
+    ]
+    settings = list(itertools.product(
+        range(len(eye)), range(len(yawn)), range(len(head_pairs)), range(len(cnn_bank))))
+
+    positive_counts = np.zeros((len(settings), 32), dtype=np.int64)
+    negative_counts = np.zeros((len(settings), 32), dtype=np.int64)
+    # Faceless frames only ever carry the CNN bit.
+    setting_cnn = np.array([setting[3] for setting in settings])
+    for c, fired in enumerate(cnn_bank[:, ~face]):
+        rows = setting_cnn == c
+        for code, cnn_fired in ((0, ~fired), (16, fired)):
+            positive_counts[rows, code] += int((cnn_fired & faceless_labels).sum())
+            negative_counts[rows, code] += int((cnn_fired & ~faceless_labels).sum())
+
+    num_frames = eye.shape[1]
+    chunk = max(1, _CHUNK_ELEMENTS // max(num_frames, 1))
+    cnn_bits = cnn_bank[:, face].astype(np.uint8) << 4
+    for start in range(0, len(settings), chunk):
+        rows = settings[start:start + chunk]
+        e, y, h, c = (np.array(column) for column in zip(*rows))
+        n_idx = np.array([head_pairs[k][0] for k in h])
+        a_idx = np.array([head_pairs[k][1] for k in h])
+        codes = (eye[e].astype(np.uint8)
+                 | (yawn[y].astype(np.uint8) << 1)
+                 | (nod[n_idx].astype(np.uint8) << 2)
+                 | (away[a_idx].astype(np.uint8) << 3)
+                 | cnn_bits[c])
+        offsets = (np.arange(len(rows)) * 32)[:, None] + codes
+        positive_counts[start:start + len(rows)] += np.bincount(
+            offsets[:, positive].ravel(), minlength=len(rows) * 32).reshape(-1, 32)
+        negative_counts[start:start + len(rows)] += np.bincount(
+            offsets[:, ~positive].ravel(), minlength=len(rows) * 32).reshape(-1, 32)
+
+    return settings, head_pairs, positive_counts, negative_counts
+
+
+def _frame_params(grid, setting, head_pairs):
+    """Maps an (eye, yawn, head, cnn) bank index tuple back to parameter values."""
+    e, y, h, c = setting
+    n_eye, n_yawn = len(grid['eye_ar_consec_frames']), len(grid['yawn_consec_frames'])
+    n_consec = len(grid['head_pose_consec_frames'])
+    nod_row, away_row = head_pairs[h]
+    return {
+        'eye_ar_thresh': grid['eye_ar_thresh'][e // n_eye],
+        'eye_ar_consec_frames': grid['eye_ar_consec_frames'][e % n_eye],
+        'yawn_mar_thresh': grid['yawn_mar_thresh'][y // n_yawn],
+        'yawn_consec_frames': grid['yawn_consec_frames'][y % n_yawn],
+        'head_nod_thresh': grid['head_nod_thresh'][nod_row // n_consec],
+        'head_look_away_thresh': grid['head_look_away_thresh'][away_row // n_consec],
+        'head_pose_consec_frames': grid['head_pose_consec_frames'][nod_row % n_consec],
+        'confidence_thresh': grid['confidence_thresh'][c],
+    }
+
+
+def _pattern_alerts(grid):
+    """Returns the weight settings and a (W, 32) matrix of which patterns raise an alert."""
+    weight_settings = list(itertools.product(*(grid[name] for name in INDICATORS), grid['alert_threshold']))
+    table = np.array(weight_settings, dtype=np.float64)
+    bits = (np.arange(32)[:, None] >> np.arange(len(INDICATORS))[None, :]) & 1
+
+    # Accumulate in the same order as the live scorer so threshold ties match exactly.
+    scores = np.zeros((len(table), 32), dtype=np.float64)
+    for k in range(len(INDICATORS)):
+        scores = np.where(bits[:, k][None, :] == 1, scores + table[:, k][:, None], scores)
+    alerts = scores >= table[:, -1][:, None]
+
+    return weight_settings, alerts
+
+
+def run_sweep(stream, labels, config, grid_spec, top_k=10, min_precision=0.0):
+    """
+    Evaluates every combination in the grid against frame-level labels.
+
+    Args:
+        stream: A recorded stream from `load_stream`.
+        labels: Per-frame boolean array, True where the driver is drowsy.
+        config: The base application config.
+        grid_spec: Candidate values, laid out like `config.yaml`.
+        top_k: Number of best combinations to return, ranked by F1.
+        min_precision: Combinations below this precision are not ranked.
+
+    Returns:
+        A tuple of (results, num_combinations), where results is a list of
+        dicts holding the parameters plus precision, recall and f1.
+    """
+    grid = build_grid(config, grid_spec)
+    settings, head_pairs, positive_counts, negative_counts = _pattern_counts(stream, grid, labels)
+    weight_settings, alerts = _pattern_alerts(grid)
+    positive_total = int(labels.sum())
+
+    alerts = alerts.T.astype(np.int64)
+    true_pos = positive_counts @ alerts
+    false_pos = negative_counts @ alerts
+
+    predicted = true_pos + false_pos
+    precision = np.divide(true_pos, predicted, out=np.zeros(true_pos.shape), where=predicted > 0)
+    recall = true_pos / positive_total if positive_total else np.zeros(true_pos.shape)
+    denom = precision + recall
+    f1 = np.divide(2 * precision * recall, denom, out=np.zeros(true_pos.shape), where=denom > 0)
+
+    ranked = np.where(precision >= min_precision, f1, -1.0).ravel()
+    top_k = min(top_k, ranked.size)
+    best = np.argpartition(-ranked, top_k - 1)[:top_k]
+    best = best[np.argsort(-ranked[best], kind='stable')]
+
+    results = []
+    for flat in best:
+        g, w = divmod(int(flat), len(weight_settings))
+        results.append({
+            **_frame_params(grid, settings[g], head_pairs),
+            **dict(zip(INDICATORS + ('alert_threshold',), weight_settings[w])),
+            'precision': float(precision[g, w]),
+            'recall': float(recall[g, w]),
+            'f1': float(f1[g, w]),
+        })
+    return results, ranked.size
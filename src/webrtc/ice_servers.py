@@ -0,0 +1,201 @@
+# drive_paddy/webrtc/ice_servers.py
+"""
+Shared, cached ICE (STUN/TURN) server configuration.
+
+TURN credentials are fetched by a pluggable backend on a background thread
+and refreshed before they expire. Sessions only ever read the cache, so
+setting up a stream never waits on a credential request and viewers do not
+each trigger an API call. Until the first fetch succeeds (or after
+credentials expire without a successful refresh), the static STUN list is
+served instead.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+
+# Public STUN servers; used on their own when no TURN credentials are available.
+STATIC_ICE_SERVERS = [
+    {"urls": ["stun:stun.l.google.com:19302"]},
+    {"urls": ["stun:stun1.l.google.com:19302"]},
+    {"urls": ["stun:stun2.l.google.com:19302"]},
+    {"urls": ["stun:stun.services.mozilla.com:3478"]},
+]
+
+
+def _normalize(server):
+    """Keeps the fields RTCIceServer understands (Twilio also sends a legacy 'url')."""
+    normalized = {"urls": server.get("urls") or server.get("url")}
+    for key in ("username", "credential"):
+        if key in server:
+            normalized[key] = server[key]
+    return normalized
+
+
+class IceServerBackend:
+    """Base class for credential backends."""
+    def fetch(self):
+        """
+        Returns:
+            A tuple of (ice_servers, ttl_seconds). A ttl of None means the
+            servers never expire.
+        """
+        raise NotImplementedError
+
+
+class StaticBackend(IceServerBackend):
+    """Serves the public STUN list only."""
+    def fetch(self):
+        return STATIC_ICE_SERVERS, None
+
+
+class TwilioBackend(IceServerBackend):
+    """Fetches short-lived TURN credentials from Twilio's Network Traversal Service."""
+    def __init__(self, account_sid, auth_token, ttl_seconds=86400):
+        from twilio.rest import Client
+        self.client = Client(account_sid, auth_token)
+        self.ttl_seconds = ttl_seconds
+
+    def fetch(self):
+        token = self.client.tokens.create(ttl=self.ttl_seconds)
+        return [_normalize(server) for server in token.ice_servers], int(token.ttl)
+
+
+class LocalBackend(IceServerBackend):
+    """
+    Stand-in for tests and local development. Issues time-limited credentials
+    for a local TURN server in the coturn shared-secret (REST API) format,
+    without any network call. `fail_next` makes the next fetch raise.
+    """
+    def __init__(self, url="turn:127.0.0.1:3478", secret="drive-paddy-local", ttl_seconds=600):
+        self.url = url
+        self.secret = secret.encode("utf-8")
+        self.ttl_seconds = ttl_seconds
+        self.fetch_count = 0
+        self.fail_next = False
+
+    def fetch(self):
+        self.fetch_count += 1
+        if self.fail_next:
+            self.fail_next = False
+            raise ConnectionError("Simulated credential fetch failure.")
+        username = f"{int(time.time()) + self.ttl_seconds}:drive-paddy"
+        credential = base64.b64encode(
+            hmac.new(self.secret, username.encode("utf-8"), hashlib.sha1).digest()).decode("ascii")
+        servers = STATIC_ICE_SERVERS[:1] + [{"urls": [self.url], "username": username, "credential": credential}]
+        return servers, self.ttl_seconds
+
+
+class IceServerProvider:
+    """
+    Caches the backend's ICE servers and refreshes them in the background.
+
+    A refresh is scheduled once `refresh_margin` of the TTL remains; failed
+    fetches are retried every `retry_seconds`. `get_ice_servers` never blocks
+    on the backend.
+    """
+    def __init__(self, backend, refresh_margin=0.2, retry_seconds=30.0, fallback=None):
+        self.backend = backend
+        self.refresh_margin = refresh_margin
+        self.retry_seconds = retry_seconds
+        self.fallback = fallback or STATIC_ICE_SERVERS
+        self._lock = threading.Lock()
+        self._servers = None
+        self._expires_at = None
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def get_ice_servers(self):
+        """Returns the cached servers, or the fallback list if none are valid."""
+        with self._lock:
+            servers, expires_at = self._servers, self._expires_at
+        if servers is None or (expires_at is not None and time.time() >= expires_at):
+            return self.fallback
+        return servers
+
+    def refresh(self):
+        """
+        Fetches new servers from the backend. Returns the number of seconds
+        until the next refresh should happen, or None if they never expire.
+        """
+        try:
+            servers, ttl = self.backend.fetch()
+        except Exception as e:
+            print(f"Warning: Could not fetch ICE servers ({type(self.backend).__name__}): {e}")
+            return self.retry_seconds
+
+        with self._lock:
+            self._servers = servers
+            self._expires_at = time.time() + ttl if ttl else None
+        return ttl * (1 - self.refresh_margin) if ttl else None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            delay = self.refresh()
+            # Wake early on stop() or refresh_now().
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def refresh_now(self):
+        """Asks the background thread to refresh immediately."""
+        self._wake.set()
+
+    def start(self):
+        """Starts the background refresher (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="ice-server-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+
+def get_backend(settings):
+    """Factory to get the credential backend named in `webrtc.ice_backend`."""
+    name = settings.get('ice_backend', 'static')
+    ttl = settings.get('credential_ttl_seconds', 86400)
+
+    if name == 'twilio':
+        account_sid = os.getenv("TWILIO_ACCOUNT_SID")
+        auth_token = os.getenv("TWILIO_AUTH_TOKEN")
+        if account_sid and auth_token:
+            try:
+                return TwilioBackend(account_sid, auth_token, ttl)
+            except ImportError:
+                print("Warning: 'twilio' is not installed; using static STUN servers only.")
+        else:
+            print("Warning: TWILIO_ACCOUNT_SID/TWILIO_AUTH_TOKEN not set; using static STUN servers only.")
+        return StaticBackend()
+    elif name == 'local':
+        return LocalBackend(ttl_seconds=ttl)
+    elif name == 'static':
+        return StaticBackend()
+    else:
+        raise ValueError(f"Unknown ICE backend: {name}")
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_ice_server_provider(config):
+    """Returns the process-wide, already-started provider shared by all sessions."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            settings = config.get('webrtc', {})
+            _provider = IceServerProvider(
+                get_backend(settings),
+                refresh_margin=settings.get('refresh_margin', 0.2),
+                retry_seconds=settings.get('retry_seconds', 30.0),
+            ).start()
+        return _provider
@@ -1,9 +1,9 @@
 import os
 
-from twilio.rest import Client
-
 from dotenv import load_dotenv
 
+from src.webrtc.ice_servers import TwilioBackend
+
 load_dotenv()
 
 
@@ -14,16 +14,16 @@ load_dotenv()
 account_sid = os.getenv("TWILIO_ACCOUNT_SID")
 auth_token = os.getenv("TWILIO_AUTH_TOKEN")
 
-client = Client(account_sid, auth_token)
-
-
-token = client.tokens.create()
+# The app does not call this script: it fetches and caches the same
+# credentials through src/webrtc/ice_servers.py. This is a manual check.
+ice_servers, ttl = TwilioBackend(account_sid, auth_token).fetch()
 
 
-print(token.ice_servers)
+print(ice_servers)
+print(f"Valid for {ttl} seconds.")
 
 # Example output:
-[{'url': 'stun:global.stun.twilio.com:3478', 'urls': 'stun:global.stun.twilio.com:3478'},
- {'credential': 'eccGMyyVUVTw/YsS/G//3WA7ysWzg7G4Jqnjndamf1c=', 'url': 'turn:global.turn.twilio.com:3478?transport=udp', 'urls': 'turn:global.turn.twilio.com:3478?transport=udp', 'username': 'fecf7f37917475768b25c30c7861ae6c0736c380538749f34db1c55c592a3ab8'},
- {'credential': 'eccGMyyVUVTw/YsS/G//3WA7ysWzg7G4Jqnjndamf1c=', 'url': 'turn:global.turn.twilio.com:3478?transport=tcp', 'urls': 'turn:global.turn.twilio.com:3478?transport=tcp', 'username': 'fecf7f37917475768b25c30c7861ae6c0736c380538749f34db1c55c592a3ab8'},
- {'credential': 'eccGMyyVUVTw/YsS/G//3WA7ysWzg7G4Jqnjndamf1c=', 'url': 'turn:global.turn.twilio.com:443?transport=tcp', 'urls': 'turn:global.turn.twilio.com:443?transport=tcp', 'username': 'fecf7f37917475768b25c30c7861ae6c0736c380538749f34db1c55c592a3ab8'}]
\ No newline at end of file
+[{'urls': 'stun:global.stun.twilio.com:3478'},
+ {'credential': '<credential>', 'urls': 'turn:global.turn.twilio.com:3478?transport=udp', 'username': '<username>'},
+ {'credential': '<credential>', 'urls': 'turn:global.turn.twilio.com:3478?transport=tcp', 'username': '<username>'},
+ {'credential': '<credential>', 'urls': 'turn:global.turn.twilio.com:443?transport=tcp', 'username': '<username>'}]
@@ -0,0 +1,118 @@
+# tune_thresholds.py
+"""
+Offline tuning for `geometric_settings`, `hybrid_settings` and the CNN's
+`confidence_thresh`.
+
+    # 1. Run the vision models over a video once and cache the measurements.
+    python tune_thresholds.py record drive.mp4 --out drive.npz --with-cnn
+
+    # 2. Check the current config.yaml against labeled drowsy segments.
+    python tune_thresholds.py replay drive.npz --labels drive_labels.yaml
+
+    # 3. Sweep candidate thresholds/weights and print the best combinations.
+    python tune_thresholds.py sweep drive.npz --labels drive_labels.yaml --grid grid.yaml
+
+The labels file lists drowsy segments in seconds:
+
+    segments:
+      - [12.0, 18.5]
+      - [95.2, 101.0]
+
+The grid file mirrors config.yaml; each entry is a list of values or a
+{start, stop, num} range. Anything not listed keeps its config.yaml value:
+
+    geometric_settings:
+      eye_ar_thresh: {start: 0.18, stop: 0.28, num: 11}
+      eye_ar_consec_frames: [10, 15, 20]
+    cnn_model_settings:
+      confidence_thresh: [0.6, 0.7, 0.8]
+    hybrid_settings:
+      alert_threshold: [0.8, 1.0, 1.2]
+      weights:
+        eye_closure: [0.45, 0.6]
+
+Recordings store the CNN's drowsy probability every 10 frames, so
+`confidence_thresh` can be replayed and swept. Replay assumes
+`hybrid_settings.cnn_cascade` is disabled; with the cascade on, the live
+detector skips and smooths CNN runs based on the score, which replay does
+not model.
+"""
+import argparse
+import time
+
+import numpy as np
+import yaml
+
+from src.tuning.replay import record_stream, load_stream, replay_stream, segments_to_mask
+from src.tuning.sweep import run_sweep
+
+
+def load_yaml(path):
+    with open(path, 'r') as f:
+        return yaml.safe_load(f) or {}
+
+
+def load_labels(path, stream):
+    segments = load_yaml(path).get('segments', [])
+    return segments_to_mask(segments, len(stream['face']), stream['fps'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record, replay and sweep Drive Paddy detection settings.")
+    parser.add_argument('--config', default='config.yaml', help="Base configuration file.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record = subparsers.add_parser('record', help="Cache per-frame measurements from a video.")
+    record.add_argument('video')
+    record.add_argument('--out', required=True)
+    record.add_argument('--with-cnn', action='store_true', help="Also cache the CNN probability stream.")
+
+    replay = subparsers.add_parser('replay', help="Score the current config against labels.")
+    replay.add_argument('stream')
+    replay.add_argument('--labels', required=True)
+
+    sweep = subparsers.add_parser('sweep', help="Evaluate a grid of thresholds and weights.")
+    sweep.add_argument('stream')
+    sweep.add_argument('--labels', required=True)
+    sweep.add_argument('--grid', required=True)
+    sweep.add_argument('--top', type=int, default=10)
+    sweep.add_argument('--min-precision', type=float, default=0.0)
+
+    args = parser.parse_args()
+    config = load_yaml(args.config)
+
+    if args.command == 'record':
+        record_stream(args.video, config, args.out, with_cnn=args.with_cnn)
+        return
+
+    stream = load_stream(args.stream)
+    labels = load_labels(args.labels, stream)
+    if config['hybrid_settings'].get('cnn_cascade', {}).get('enabled', False):
+        print("Note: cnn_cascade is enabled in the config, but replay runs the CNN at a fixed cadence "
+              "without smoothing; results describe the non-cascade detector.")
+    if 'cnn_probability' not in stream:
+        print("Note: this recording predates CNN probabilities; its CNN predictions were thresholded "
+              "at record time and confidence_thresh has no effect. Re-record to tune it.")
+
+    if args.command == 'replay':
+        _, alerts = replay_stream(stream, config)
+        true_pos = int(np.sum(alerts & labels))
+        precision = true_pos / alerts.sum() if alerts.sum() else 0.0
+        recall = true_pos / labels.sum() if labels.sum() else 0.0
+        print(f"Frames: {len(alerts)}  Alerts: {int(alerts.sum())}  Labeled: {int(labels.sum())}")
+        print(f"Precision: {precision:.3f}  Recall: {recall:.3f}")
+        return
+
+    start = time.perf_counter()
+    results, num_combinations = run_sweep(
+        stream, labels, config, load_yaml(args.grid), top_k=args.top, min_precision=args.min_precision)
+    elapsed = time.perf_counter() - start
+    print(f"Evaluated {num_combinations} combinations over {len(labels)} frames in {elapsed:.2f}s.\n")
+    for rank, result in enumerate(results, 1):
+        metrics = f"P={result['precision']:.3f} R={result['recall']:.3f} F1={result['f1']:.3f}"
+        params = ", ".join(f"{k}={v:g}" for k, v in result.items() if k not in ('precision', 'recall', 'f1'))
+        print(f"{rank:>2}. {metrics} | {params}")
+
+
+if __name__ == "__main__":
+    main()